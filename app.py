@@ -3,22 +3,96 @@
 # Description: Streamlit Chatbot for Platform Engineering GitHub Analysis.
 # ----------------------------------------------------------------------
 import os
+import re
+from concurrent.futures import ThreadPoolExecutor
 import streamlit as st
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+# NEW: Import the health check function
+from github_tool import check_latest_release, check_latest_releases_bulk, get_dependency_file, get_release_prs, get_prefetched_api_health, start_health_prefetch
+
+# Start the sidebar's rate-limit check now so it overlaps with the slow google.genai
+# import below (a no-op on reruns, where the import is already cached as well)
+start_health_prefetch()
+
 from google import genai
 from google.genai import types
-# NEW: Import the health check function
-from github_tool import check_latest_release, get_dependency_file, get_release_prs, check_github_api_health 
 
 # --- Tool Configuration ---
 
-# 1. Map the functions to a dictionary for execution
+# 1. Cache tool results per argument set; github_tool stays framework-agnostic.
+# Only successes are cached: a failing call raises ToolFailure inside the cached
+# function (st.cache_data never stores a call that raises), and the wrapper turns it
+# back into the error output, so a rate-limit hit is retried on the next prompt.
+# Spinners are off because tools run in worker threads (see handle_tool_call).
+
+class ToolFailure(Exception):
+    """Carries a tool's ERROR/TOOL_ERROR/PARTIAL output out of a cached call."""
+    def __init__(self, output):
+        super().__init__(output)
+        self.output = output
+
+
+def raise_unless_success(output):
+    """Returns a SUCCESS tool output, raising ToolFailure for anything else."""
+    if isinstance(output, dict):
+        # Bulk results also count as failed if any single repository failed
+        entries = [output] + output.get("releases", [])
+        succeeded = all(entry.get("status") == "SUCCESS" for entry in entries)
+    else:
+        succeeded = output.startswith("SUCCESS")
+    if not succeeded:
+        raise ToolFailure(output)
+    return output
+
+
+def uncached_failures(cached_tool):
+    """Wraps a cached tool so a ToolFailure is returned as its (uncached) error output."""
+    def run_tool(**kwargs):
+        try:
+            return cached_tool(**kwargs)
+        except ToolFailure as failure:
+            return failure.output
+    return run_tool
+
+
+@st.cache_data(ttl=300, show_spinner=False) # Releases: 5 minutes
+def cached_check_latest_release(org_name, repo_name):
+    return raise_unless_success(check_latest_release(org_name, repo_name))
+
+
+@st.cache_data(ttl=300, show_spinner=False) # Releases: 5 minutes
+def cached_check_latest_releases_bulk(repos):
+    return raise_unless_success(check_latest_releases_bulk(repos))
+
+
+@st.cache_data(ttl=3600, show_spinner=False) # File snippets: 1 hour
+def cached_get_dependency_file(org_name, repo_name, file_path):
+    return raise_unless_success(get_dependency_file(org_name, repo_name, file_path))
+
+
+@st.cache_data(ttl=600, show_spinner=False) # PR analysis: 10 minutes
+def cached_get_release_prs(org_name, repo_name, tag_name):
+    return raise_unless_success(get_release_prs(org_name, repo_name, tag_name))
+
+# 2. Map the functions to a dictionary for execution
 AVAILABLE_TOOLS = {
-    "check_latest_release": check_latest_release,
-    "get_dependency_file": get_dependency_file,
-    "get_release_prs": get_release_prs,
+    "check_latest_release": uncached_failures(cached_check_latest_release),
+    "check_latest_releases_bulk": uncached_failures(cached_check_latest_releases_bulk),
+    "get_dependency_file": uncached_failures(cached_get_dependency_file),
+    "get_release_prs": uncached_failures(cached_get_release_prs),
 }
 
-# 2. Define the tool structure for Gemini (critical for function calling)
+# Upper bound on tools executed in parallel for a single model response
+MAX_TOOL_WORKERS = 8
+
+# Chaining: when the user asks about a release's changes, the tag found by
+# check_latest_release is fed straight into get_release_prs, saving a model round trip.
+RELEASE_CHANGES_PATTERN = re.compile(
+    r"\b(bug\s?fix(es)?|fix(es)?|change[sd]?|changelog|prs?|pull requests?|features?|enhancements?)\b",
+    re.IGNORECASE,
+)
+
+# 3. Define the tool structure for Gemini (critical for function calling)
 TOOL_DEFINITION_DICT = {
     "function_declarations": [
         # Tool 1: Latest Release
@@ -62,9 +136,35 @@ TOOL_DEFINITION_DICT = {
                 "required": ["org_name", "repo_name", "tag_name"],
             },
         },
+        # Tool 4: Latest Releases for Several Repositories
+        {
+            "name": "check_latest_releases_bulk",
+            "description": check_latest_releases_bulk.__doc__ or "Checks the latest stable release of several public repositories at once in a single GitHub request.",
+            "parameters": {
+                "type": "OBJECT",
+                "properties": {
+                    "repos": {
+                        "type": "ARRAY",
+                        "description": "The repositories to check (e.g., hashicorp/vault and hashicorp/consul).",
+                        "items": {
+                            "type": "OBJECT",
+                            "properties": {
+                                "org_name": {"type": "STRING", "description": "The GitHub organization or user name (e.g., 'hashicorp')."},
+                                "repo_name": {"type": "STRING", "description": "The GitHub repository name (e.g., 'vault')."}
+                            },
+                            "required": ["org_name", "repo_name"],
+                        },
+                    }
+                },
+                "required": ["repos"],
+            },
+        },
     ]
 }
 
+# 4. Validate the schema into a Tool object once, instead of on every new chat session
+TOOL_OBJ = types.Tool(function_declarations=TOOL_DEFINITION_DICT["function_declarations"])
+
 # --- Client and Chat Initialization Functions ---
 
 def create_gemini_client():
@@ -92,17 +192,21 @@ def create_chat_session(client):
         "1. Checking the latest GitHub release. "
         "2. Getting the first 10 lines of a dependency file. "
         "3. **Analyzing the Bug Fixes and Enhancements** for a specific release tag. "
+        "4. Checking the latest GitHub releases of several repositories at once (use this instead of repeated single checks). "
 
         "**ABSOLUTELY DO NOT** claim to be able to write code, provide debugging help, or offer general coding advice. "
         "Your final answer **MUST** be based **EXCLUSIVELY** on the content of the `tool_output` received from the function call. "
         "Only execute a function call if the user's request clearly maps to one of the available tools. "
         "Synthesize the raw tool output into a clear, professional, and conversational report. "
+        "If a `check_latest_release` result also contains `release_prs`, that is the Bug Fix and Enhancement "
+        "analysis for the same release; use it instead of calling `get_release_prs` again. "
+        "If a tool output is PARTIAL or carries a note, tell the user the results may be incomplete. "
     )
 
     chat = client.chats.create(
         model=model,
         config=types.GenerateContentConfig(
-            tools=[TOOL_DEFINITION_DICT],
+            tools=[TOOL_OBJ],
             system_instruction=SYSTEM_INSTRUCTION
         )
     )
@@ -110,7 +214,23 @@ def create_chat_session(client):
 
 # --- Tool Call Handler (Updated for Gemini Call Counting) ---
 
-def handle_tool_call(chat_session, response):
+def execute_tool(function_name, args, chain_release_prs=False):
+    """
+    Executes a tool and returns its function response payload. With chain_release_prs,
+    a successful check_latest_release is followed directly by get_release_prs on the
+    reported tag, and both outputs are returned together.
+    """
+    payload = {'output': AVAILABLE_TOOLS[function_name](**args)}
+
+    if chain_release_prs and function_name == "check_latest_release":
+        latest = payload['output']
+        if latest.get("status") == "SUCCESS":
+            payload['release_prs'] = AVAILABLE_TOOLS["get_release_prs"](
+                org_name=args["org_name"], repo_name=args["repo_name"], tag_name=latest["version"]
+            )
+    return payload
+
+def handle_tool_call(chat_session, response, user_prompt=""):
     """Handles the function calling loop until the final text response is received."""
     with st.chat_message("assistant"):
         status_placeholder = st.empty()
@@ -118,21 +238,43 @@ def handle_tool_call(chat_session, response):
         while response.function_calls:
             status_placeholder.info("🤖 Agent is performing GitHub analysis... (Calling Tool)")
 
-            tool_results = []
-            for function_call in response.function_calls:
-                function_name = function_call.name
-                args = dict(function_call.args)
-
-                tool_msg = f"⚙️ Calling `{function_name}` with args: `{args}`"
-                status_placeholder.markdown(tool_msg)
+            function_calls = response.function_calls
+            tool_msg = "\n\n".join(
+                f"⚙️ Calling `{function_call.name}` with args: `{dict(function_call.args)}`"
+                for function_call in function_calls
+            )
+            status_placeholder.markdown(tool_msg)
+
+            # Chain only when the user asked about changes and the model did not already
+            # request the analysis itself in this batch.
+            chain_release_prs = bool(RELEASE_CHANGES_PATTERN.search(user_prompt)) and not any(
+                function_call.name == "get_release_prs" for function_call in function_calls
+            )
+
+            # Execute the actual Python functions concurrently: each tool is a blocking
+            # GitHub call, so the turn waits for the slowest one instead of the sum.
+            # Workers share this run's script context so the st.cache_data tools can use it.
+            with ThreadPoolExecutor(
+                max_workers=min(MAX_TOOL_WORKERS, len(function_calls)),
+                initializer=add_script_run_ctx,
+                initargs=(None, get_script_run_ctx()),
+            ) as executor:
+                futures = [
+                    (
+                        function_call.name,
+                        executor.submit(execute_tool, function_call.name, dict(function_call.args), chain_release_prs)
+                        if function_call.name in AVAILABLE_TOOLS else None,
+                    )
+                    for function_call in function_calls
+                ]
 
-                if function_name in AVAILABLE_TOOLS:
-                    # Execute the actual Python function
-                    tool_output = AVAILABLE_TOOLS[function_name](**args)
+            tool_results = []
+            for function_name, future in futures:
+                if future is not None:
                     tool_results.append(
                         types.Part.from_function_response(
                             name=function_name,
-                            response={'output': tool_output}
+                            response=future.result()
                         )
                     )
                 else:
@@ -156,8 +298,8 @@ def handle_tool_call(chat_session, response):
 
 @st.cache_data(ttl=300) # Cache the health check for 5 minutes
 def get_health_metrics():
-    """Fetches GitHub health metrics once and caches them."""
-    return check_github_api_health()
+    """Fetches GitHub health metrics once and caches them (first call uses the import-time prefetch)."""
+    return get_prefetched_api_health()
 
 
 def display_health_dashboard():
@@ -191,11 +333,18 @@ def display_health_dashboard():
 
     # 2. Gemini API Health (Call Counter)
     st.sidebar.subheader("Gemini API Usage")
-    st.sidebar.metric(
+    # Placeholder so the counter can be refreshed in place after each turn
+    st.session_state.gemini_metric_ph = st.sidebar.empty()
+    update_gemini_metric()
+    st.sidebar.caption("This counter resets on app refresh.")
+
+
+def update_gemini_metric():
+    """Redraws the Gemini call counter in its sidebar placeholder, without a rerun."""
+    st.session_state.gemini_metric_ph.metric(
         "Session Calls Made", 
         st.session_state.get('gemini_calls', 0)
     )
-    st.sidebar.caption("This counter resets on app refresh.")
 
 
 # --- Streamlit Application (UPDATED) ---
@@ -225,12 +374,15 @@ def run_agent_streamlit():
             return
 
         st.session_state.gemini_client = client
-        st.session_state.chat_client = create_chat_session(client=st.session_state.gemini_client)
+
+        # Build the chat session in the background so it overlaps with the user typing
+        # (the worker never touches st.*; the session is collected on the first prompt)
+        session_executor = ThreadPoolExecutor(max_workers=1)
+        st.session_state.chat_future = session_executor.submit(create_chat_session, client)
+        session_executor.shutdown(wait=False)
 
         if not os.getenv("GITHUB_TOKEN"):
             st.sidebar.warning("⚠️ **Warning**: GitHub API is using low **anonymous rate limit** (60 reqs/hr). Set **GITHUB_TOKEN** for high reliability.")
-        
-    chat_client = st.session_state.chat_client
 
     # Display chat history
     for message in st.session_state.messages:
@@ -243,11 +395,14 @@ def run_agent_streamlit():
         with st.chat_message("user"):
             st.markdown(user_prompt)
 
+        # Waits only if the background session construction is still running
+        chat_client = st.session_state.chat_future.result()
+
         # Initial call
         st.session_state.gemini_calls += 1 # NEW: Increment counter for the initial call
         initial_response = chat_client.send_message(user_prompt)
         
-        final_response = handle_tool_call(chat_client, initial_response)
+        final_response = handle_tool_call(chat_client, initial_response, user_prompt)
 
         assistant_content = final_response.text
         with st.chat_message("assistant"):
@@ -255,8 +410,8 @@ def run_agent_streamlit():
 
         st.session_state.messages.append({"role": "assistant", "content": assistant_content})
         
-        # NEW: Rerun to update the health dashboard metrics immediately
-        st.rerun() 
+        # Update the call counter in place instead of re-running the whole script
+        update_gemini_metric() 
 
 if __name__ == "__main__":
     run_agent_streamlit()
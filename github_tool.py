@@ -2,64 +2,163 @@
 # File: github_tool.py (Updated with Release Analysis)
 # Description: Contains the GitHub API functions for the Gemini Agent.
 # ----------------------------------------------------------------------
+import asyncio
+import itertools
 import os
-import requests
+import sys
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+import httpx
+import orjson
 from datetime import datetime
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Sequence, Tuple, Union
+
+# --- Shared HTTP client ---
+
+# The token cannot change while the process runs, so headers are built once.
+# Treat _AUTH_HEADERS as read-only; use _auth_headers() for a variant.
+_GITHUB_TOKEN = os.getenv("GITHUB_TOKEN")
+_DEFAULT_ACCEPT = "application/vnd.github.v3+json"
+_AUTH_HEADERS: Dict[str, str] = {"Accept": _DEFAULT_ACCEPT}
+if _GITHUB_TOKEN:
+    _AUTH_HEADERS["Authorization"] = f"Bearer {_GITHUB_TOKEN}"
+
+def _auth_headers(accept: str = _DEFAULT_ACCEPT) -> Dict[str, str]:
+    """Internal helper returning the auth headers, copied only for a non-default Accept."""
+    if accept == _DEFAULT_ACCEPT:
+        return _AUTH_HEADERS
+    return {**_AUTH_HEADERS, "Accept": accept}
+
+# Wait up to 10s on GitHub overall, but fail fast when it cannot be reached.
+_REQUEST_TIMEOUT = httpx.Timeout(10.0, connect=3.0)
+
+# One HTTP/2 client multiplexes every call (including parallel tool calls) over a
+# single kept-alive connection to api.github.com; the transport retries connects.
+_CLIENT = httpx.Client(
+    headers=_AUTH_HEADERS,
+    timeout=_REQUEST_TIMEOUT,
+    follow_redirects=True,  # renamed/transferred repos answer with a 301
+    transport=httpx.HTTPTransport(http2=True, retries=3),
+)
+
+# Transient gateway errors are retried with exponential backoff (or Retry-After).
+_RETRY_STATUSES = frozenset({502, 503, 504})
+_MAX_RETRIES = 3
+_BACKOFF_FACTOR = 0.5
+
+def _send(method: str, url: str, stream: bool = False, **kwargs: Any) -> httpx.Response:
+    """Internal helper sending a request on the shared client, retrying gateway errors."""
+    request = _CLIENT.build_request(method, url, **kwargs)
+    for attempt in range(_MAX_RETRIES + 1):
+        response = _CLIENT.send(request, stream=stream)
+        if response.status_code not in _RETRY_STATUSES or attempt == _MAX_RETRIES:
+            return response  # the last response is handed back so tools can report it
+        response.close()
+        retry_after = response.headers.get("Retry-After", "")
+        time.sleep(int(retry_after) if retry_after.isdigit() else _BACKOFF_FACTOR * (2 ** attempt))
+
+class _CachedResponse:
+    """Stands in for an `httpx.Response` replayed from the ETag cache."""
+    status_code = 200
+
+    def __init__(self, content: bytes):
+        self.content = content
+
+def _json(response: Any) -> Any:
+    """Internal helper to decode a JSON body straight from bytes with orjson."""
+    return orjson.loads(response.content)
+
+# (url, params, Accept) -> (ETag, last 200 body). A 304 answer does not count
+# against the rate limit and carries no body, so we replay the cached one.
+# Bodies are kept, so the cache is a small LRU; tool threads share it via the lock.
+_ETAG_CACHE_MAX_ENTRIES = 128
+_etag_cache: "OrderedDict[Tuple[str, Tuple, str], Tuple[str, _CachedResponse]]" = OrderedDict()
+_etag_cache_lock = threading.Lock()
+
+def _make_api_call(url: str, headers: Dict[str, str], params: Optional[Dict[str, Any]] = None, stream: bool = False) -> Union[httpx.Response, _CachedResponse]:
+    """
+    Internal helper for API calls with basic error handling and ETag revalidation.
+    With stream=True the body is left unread for the caller (and the caller must
+    close the response); streamed calls bypass the ETag cache since their body is
+    never fully downloaded.
+    """
+    if stream:
+        return _send("GET", url, stream=True, headers=headers, params=params)
+
+    cache_key = (url, tuple(sorted((params or {}).items())), headers.get("Accept", ""))
+    with _etag_cache_lock:
+        cached = _etag_cache.get(cache_key)
+        if cached:
+            _etag_cache.move_to_end(cache_key)
+    if cached:
+        headers = {**headers, "If-None-Match": cached[0]}
+
+    response = _send("GET", url, headers=headers, params=params)
+
+    if response.status_code == 304 and cached:
+        return cached[1]
+    if response.status_code == 200 and response.headers.get("ETag"):
+        with _etag_cache_lock:
+            _etag_cache[cache_key] = (response.headers["ETag"], _CachedResponse(response.content))
+            _etag_cache.move_to_end(cache_key)
+            if len(_etag_cache) > _ETAG_CACHE_MAX_ENTRIES:
+                _etag_cache.popitem(last=False)
+    return response
+
+# Python 3.11+ parses the trailing 'Z' of GitHub timestamps natively.
+if sys.version_info >= (3, 11):
+    def _parse_github_timestamp(value: str) -> datetime:
+        """Internal helper to parse an ISO 8601 GitHub timestamp."""
+        return datetime.fromisoformat(value)
+else:
+    def _parse_github_timestamp(value: str) -> datetime:
+        """Internal helper to parse an ISO 8601 GitHub timestamp."""
+        return datetime.fromisoformat(value.replace('Z', '+00:00'))
 
 # --- Tool 1: Check Latest Release (Existing) ---
 
-def _get_auth_headers() -> Dict[str, str]:
-    """Internal helper to create headers with the GitHub token."""
-    github_token = os.getenv("GITHUB_TOKEN")
-    headers = {"Accept": "application/vnd.github.v3+json"}
-    if github_token:
-        headers["Authorization"] = f"token {github_token}"
-    return headers
-
-def _make_api_call(url: str, headers: Dict[str, str], params: Optional[Dict[str, Any]] = None) -> requests.Response:
-    """Internal helper for API calls with basic error handling."""
-    return requests.get(url, headers=headers, params=params)
+def _release_summary(repository: str, version: str, published_at: Optional[str], url: str, notes: Optional[str]) -> Dict[str, Any]:
+    """Builds the compact release fields for the model to phrase itself."""
+    return {
+        "status": "SUCCESS",
+        "repository": repository,
+        "version": version,
+        "published": _parse_github_timestamp(published_at).date().isoformat() if published_at else 'N/A',
+        "url": url,
+        "notes": (notes or '')[:100].replace('\n', ' '),
+    }
 
-def check_latest_release(org_name: str, repo_name: str) -> str:
+def check_latest_release(org_name: str, repo_name: str) -> Dict[str, Any]:
     """
     Checks the latest stable release version, publish date, and the direct
     GitHub release URL for a public repository (e.g., hashicorp/vault).
     """
     api_url = f"https://api.github.com/repos/{org_name}/{repo_name}/releases/latest"
-    headers = _get_auth_headers()
+    headers = _AUTH_HEADERS
 
     try:
         response = _make_api_call(api_url, headers)
 
         if response.status_code == 404:
-            return f"ERROR: Repository {org_name}/{repo_name} not found or has no releases."
+            return {"status": "ERROR", "message": f"Repository {org_name}/{repo_name} not found or has no releases."}
         if response.status_code == 403:
-            return f"ERROR: GitHub API failed with status code 403. Check GITHUB_TOKEN and rate limit."
+            return {"status": "ERROR", "message": "GitHub API failed with status code 403. Check GITHUB_TOKEN and rate limit."}
         if response.status_code != 200:
-            return f"ERROR: GitHub API failed with status code {response.status_code}."
-
-        data = response.json()
-
-        version = data.get('tag_name', 'N/A')
-        published_at_str = data.get('published_at', 'N/A')
-        release_url = data.get('html_url', 'N/A')
+            return {"status": "ERROR", "message": f"GitHub API failed with status code {response.status_code}."}
 
-        published_date = 'N/A'
-        if published_at_str != 'N/A':
-            published_at = datetime.fromisoformat(published_at_str.replace('Z', '+00:00'))
-            published_date = published_at.strftime("%Y-%m-%d")
+        data = _json(response)
 
-        body_snippet = data.get('body', '')[:100].replace('\n', ' ') + '...'
-
-        return (
-            f"SUCCESS: **{org_name}/{repo_name}** Latest Release: **{version}** | "
-            f"Published: {published_date}. "
-            f"Release URL: {release_url}. "
-            f"Notes Snippet: \"{body_snippet}\""
+        return _release_summary(
+            f"{org_name}/{repo_name}",
+            data.get('tag_name', 'N/A'),
+            data.get('published_at'),
+            data.get('html_url', 'N/A'),
+            data.get('body'),
         )
-    except requests.exceptions.RequestException as e:
-        return f"TOOL_ERROR: Network or connection issue: {str(e)}"
+    except (httpx.HTTPError, orjson.JSONDecodeError) as e:
+        return {"status": "TOOL_ERROR", "message": f"Network or connection issue: {str(e)}"}
 
 # --- Tool 2: Get Dependency File Content (Existing) ---
 
@@ -71,24 +170,24 @@ def get_dependency_file(org_name: str, repo_name: str, file_path: str) -> str:
     api_url = f"https://api.github.com/repos/{org_name}/{repo_name}/contents/{file_path}"
     
     # We need the 'raw' Accept header for direct file content
-    headers = {"Accept": "application/vnd.github.v3.raw"}
-    github_token = os.getenv("GITHUB_TOKEN")
-    if github_token:
-        headers["Authorization"] = f"token {github_token}"
+    headers = _auth_headers(accept="application/vnd.github.v3.raw")
 
     try:
-        response = _make_api_call(api_url, headers)
-
-        if response.status_code == 404:
-            return f"ERROR: File '{file_path}' not found in {org_name}/{repo_name}."
-        if response.status_code == 403:
-            return f"ERROR: GitHub API failed with status code 403. Check GITHUB_TOKEN and rate limit."
-        if response.status_code != 200:
-            return f"ERROR: GitHub API failed with status code {response.status_code}."
-
-        content_text = response.text
-        lines = content_text.split('\n')
-        snippet = '\n'.join(lines[:10])
+        # Stream the body: lockfiles can be megabytes and we only need the head
+        response = _make_api_call(api_url, headers, stream=True)
+        try:
+            if response.status_code == 404:
+                return f"ERROR: File '{file_path}' not found in {org_name}/{repo_name}."
+            if response.status_code == 403:
+                return f"ERROR: GitHub API failed with status code 403. Check GITHUB_TOKEN and rate limit."
+            if response.status_code != 200:
+                return f"ERROR: GitHub API failed with status code {response.status_code}."
+
+            lines = list(itertools.islice(response.iter_lines(), 10))
+            snippet = '\n'.join(lines)
+        finally:
+            # Stops the transfer instead of downloading the rest of the file
+            response.close()
 
         return f"SUCCESS: Content of `{file_path}`:\n```\n{snippet}\n```"
 
@@ -99,126 +198,399 @@ def get_dependency_file(org_name: str, repo_name: str, file_path: str) -> str:
 # --- Tool 3: Get Release Pull Requests (NEW) ---
 # ----------------------------------------------------------------------
 
-def _fetch_merged_prs(org_name: str, repo_name: str, published_date: str) -> List[Dict[str, Any]]:
-    """Helper to fetch recently merged PRs before a given published date."""
+# Label keywords and title prefixes (Conventional Commits) used for categorization.
+_BUG_KW = frozenset({"bug", "fix", "defect", "hotfix"})
+_ENH_KW = frozenset({"feature", "enhancement", "new", "feat"})
+_FIX_PREFIXES = ("fix", "bugfix")
+_FEAT_PREFIXES = ("feat",)
+
+# Bound on in-flight requests per analysis so fan-out stays polite to the API.
+_MAX_CONCURRENT_REQUESTS = 5
+
+# PR paging (both paths): GitHub's maximum page size, and a cap so a busy window
+# cannot trigger an unbounded scan.
+_PR_PAGE_SIZE = 100
+_MAX_PR_PAGES = 5
+_SCAN_CAPPED_NOTE = f"Note: Scan stopped after {_MAX_PR_PAGES * _PR_PAGE_SIZE} PRs; results may be incomplete."
+
+# A PR belongs to a release when it was merged after the previous release was
+# published and no later than this one. Published releases do not move, so the
+# previous release's date (None for a first release) is cached per tag; each
+# entry is a single date string.
+_RELEASES_PAGE_SIZE = 100
+_previous_release_cache: Dict[Tuple[str, str, str], Optional[str]] = {}
+
+def _remember_previous_release(key: Tuple[str, str, str], release_dates: List[Optional[str]], published_at: str) -> Optional[str]:
+    """Picks the latest release publish date before `published_at` and caches it for `key`."""
+    previous_at = max((date for date in release_dates if date and date < published_at), default=None)
+    # On a full page an older previous release may just not be listed, so don't cache a guess
+    if previous_at is not None or len(release_dates) < _RELEASES_PAGE_SIZE:
+        _previous_release_cache[key] = previous_at
+    return previous_at
+
+def _in_release_window(merged_at: Optional[str], published_at: str, previous_at: Optional[str]) -> bool:
+    """Whether a PR merged at `merged_at` shipped in the release published at `published_at`."""
+    return bool(merged_at) and merged_at <= published_at and (previous_at is None or merged_at > previous_at)
+
+async def _afetch(
+    client: httpx.AsyncClient,
+    semaphore: asyncio.Semaphore,
+    url: str,
+    headers: Dict[str, str],
+    params: Optional[Dict[str, Any]] = None,
+) -> httpx.Response:
+    """Internal async counterpart of `_make_api_call`, bounded by the semaphore."""
+    async with semaphore:
+        return await client.get(url, headers=headers, params=params)
+
+class _PageStatusError(Exception):
+    """Raised when the first page of a listing fails, so there is no partial result to return."""
+    def __init__(self, status_code: int):
+        super().__init__(f"status code {status_code}")
+        self.status_code = status_code
+
+async def _release_window(
+    key: Tuple[str, str, str],
+    release_task: "asyncio.Task[httpx.Response]",
+    releases_task: "Optional[asyncio.Task[httpx.Response]]",
+) -> Optional[Tuple[str, Optional[str]]]:
+    """
+    Resolves (published_at, previous_published_at) once the lookups finish, or None
+    if the release was not found. Without `releases_task` the cached date is used.
+    """
+    release_response = await release_task
+    if release_response.status_code != 200:
+        return None
+    published_at = _json(release_response).get('published_at') or datetime.now().isoformat()
+
+    if releases_task is None:
+        return published_at, _previous_release_cache.get(key)
+
+    releases_response = await releases_task
+    if releases_response.status_code != 200:
+        return published_at, None # Unknown: the caller reports the widened window
+    release_dates = [release.get('published_at') for release in _json(releases_response)]
+    return published_at, _remember_previous_release(key, release_dates, published_at)
+
+async def _fetch_merged_prs(
+    client: httpx.AsyncClient,
+    semaphore: asyncio.Semaphore,
+    org_name: str,
+    repo_name: str,
+    window_task: "asyncio.Task[Optional[Tuple[str, Optional[str]]]]",
+) -> Tuple[List[Dict[str, Any]], Optional[int], bool]:
+    """
+    Helper to fetch the PRs merged within the release window, most recently updated
+    first. Pages are followed through the `Link` header until items were last updated
+    before the previous release or `_MAX_PR_PAGES` is reached.
+
+    Returns the PRs, the status code of a later page that failed (None if all pages
+    loaded), and whether the page cap ended the scan before the cutoff or the last
+    page; a failure on the first page raises `_PageStatusError` instead.
+    """
     
     # We query for closed/merged PRs, sorted by most recent update
     api_url = f"https://api.github.com/repos/{org_name}/{repo_name}/issues"
-    headers = _get_auth_headers()
+    headers = _AUTH_HEADERS
     
-    # We fetch closed issues (which includes PRs) updated after a relevant time
+    # The window is not known yet (it is fetched concurrently), so instead of the
+    # `since` filter we stop paging once items predate the previous release: a PR
+    # last updated before it cannot have been merged after it.
     # A robust solution needs tag commit comparison, but we simplify with a time filter
-    params = {
+    params: Optional[Dict[str, Any]] = {
         "state": "closed",
         "sort": "updated",
         "direction": "desc",
-        "since": published_date, # Only PRs updated since the release date (as a proxy)
-        "per_page": 50
+        "per_page": _PR_PAGE_SIZE
     }
     
-    response = _make_api_call(api_url, headers, params=params)
-    if response.status_code != 200:
-        return []
-
-    all_closed_items = response.json()
-    
     prs = []
-    for item in all_closed_items:
-        # Check if it's a Pull Request AND if it has a merged_at date
-        if 'pull_request' in item and item.get("pull_request", {}).get("merged_at"):
-            prs.append({
-                "number": item['number'],
-                "title": item['title'],
-                "labels": [label['name'] for label in item.get('labels', [])],
-                "url": item['html_url'],
-            })
+    failed_status = None
+    capped = False
+    for page in range(_MAX_PR_PAGES):
+        response = await _afetch(client, semaphore, api_url, headers, params=params)
+        if response.status_code != 200:
+            if page == 0:
+                raise _PageStatusError(response.status_code)
+            failed_status = response.status_code
+            break
+
+        # Only the first page races the release lookups; later awaits return at once
+        window = await window_task
+        if window is None:
+            break
+        published_at, previous_at = window
+
+        reached_cutoff = False
+        for item in _json(response):
+            if previous_at and item.get('updated_at', '') < previous_at:
+                reached_cutoff = True
+                break
+            # Check if it's a Pull Request merged within the release window
+            if 'pull_request' in item and _in_release_window(item["pull_request"].get("merged_at"), published_at, previous_at):
+                prs.append({
+                    "number": item['number'],
+                    "title": item['title'],
+                    "labels": [label['name'] for label in item.get('labels', [])],
+                    "url": item['html_url'],
+                })
+
+        next_url = response.links.get("next", {}).get("url")
+        if reached_cutoff or not next_url:
+            break
+        api_url, params = next_url, None # The `next` link already carries the query
+    else:
+        capped = True # Reached neither the cutoff nor the last page
             
-    return prs
+    return prs, failed_status, capped
 
-def get_release_prs(org_name: str, repo_name: str, tag_name: str) -> str:
-    """
-    Analyzes merged Pull Requests that were included in a specific release tag
-    and categorizes them into Bug Fixes, Enhancements, and Other Changes based
-    on labels and Conventional Commit prefixes (fix:, feat:).
-    """
-    
-    # 1. Get the release date to narrow the PR search
-    release_url = f"https://api.github.com/repos/{org_name}/{repo_name}/releases/tags/{tag_name}"
-    release_response = _make_api_call(release_url, _get_auth_headers())
-    
+async def _get_release_prs_async(org_name: str, repo_name: str, tag_name: str) -> str:
+    """REST body of `get_release_prs`; the release and PR lookups run concurrently."""
+
+    # 1. Get the release window and the first page of candidate PRs in a single round trip
+    repo_url = f"https://api.github.com/repos/{org_name}/{repo_name}"
+    key = (org_name, repo_name, tag_name)
+    semaphore = asyncio.Semaphore(_MAX_CONCURRENT_REQUESTS)
+
+    # The client is scoped to this event loop; pooled connections cannot outlive it.
+    async with httpx.AsyncClient(http2=True, headers=_AUTH_HEADERS, timeout=_REQUEST_TIMEOUT, follow_redirects=True) as client:
+        release_task = asyncio.ensure_future(
+            _afetch(client, semaphore, f"{repo_url}/releases/tags/{tag_name}", _AUTH_HEADERS)
+        )
+        releases_task = None
+        if key not in _previous_release_cache:
+            releases_task = asyncio.ensure_future(
+                _afetch(client, semaphore, f"{repo_url}/releases", _AUTH_HEADERS, params={"per_page": _RELEASES_PAGE_SIZE})
+            )
+        window_task = asyncio.ensure_future(_release_window(key, release_task, releases_task))
+        # Every task is gathered so its outcome is always retrieved
+        release_response, _, prs_result, *releases_result = await asyncio.gather(
+            release_task,
+            window_task,
+            _fetch_merged_prs(client, semaphore, org_name, repo_name, window_task),
+            *([releases_task] if releases_task else []),
+            return_exceptions=True,
+        )
+
+    if isinstance(release_response, Exception):
+        return f"TOOL_ERROR: Network or connection issue: {str(release_response)}"
     if release_response.status_code != 200:
         return f"ERROR: Could not find release tag `{tag_name}` for categorization. Status: {release_response.status_code}."
-        
-    release_data = release_response.json()
-    published_date_str = release_data.get('published_at', datetime.now().isoformat())
     
-    # 2. Fetch relevant PRs
-    try:
-        # Note: We use the published date of the *previous* release or a relevant window
-        # For simplicity here, we fetch all PRs updated *since* the target release date
-        # (This is an imperfect proxy, but allows the model to categorize the most recent work)
-        all_prs = _fetch_merged_prs(org_name, repo_name, published_date_str)
-    except Exception as e:
-        return f"TOOL_ERROR: Failed to fetch PRs for release. Error: {str(e)}"
+    # 2. Collect the PRs merged between the previous release and this one
+    if isinstance(prs_result, _PageStatusError):
+        if prs_result.status_code == 403:
+            return "ERROR: GitHub API failed with status code 403. Check GITHUB_TOKEN and rate limit."
+        return f"ERROR: GitHub API failed with status code {prs_result.status_code}."
+    if isinstance(prs_result, Exception):
+        return f"TOOL_ERROR: Failed to fetch PRs for release. Error: {str(prs_result)}"
+
+    prs, failed_status, capped = prs_result
+    notes = [_SCAN_CAPPED_NOTE] if capped else []
+    partial = False
+    if failed_status is not None:
+        partial = True
+        notes.append(f"Note: Listing PRs stopped early with status code {failed_status}; results may be incomplete.")
+    # Without the previous release the window reaches back as far as the pages go
+    if releases_result and releases_result[0].status_code != 200:
+        partial = True
+        notes.append(
+            f"Note: Could not list releases (status code {releases_result[0].status_code}); "
+            "PRs from earlier releases may be included."
+        )
 
-    if not all_prs:
-        return f"SUCCESS: Found no recently merged Pull Requests for release `{tag_name}`."
+    return _summarize_release_prs(org_name, repo_name, tag_name, prs, notes, partial=partial)
+
+GRAPHQL_URL = "https://api.github.com/graphql"
 
-    # 3. Categorize Changes
-    summary = {
-        "Bug Fixes": [],
-        "Enhancements/Features": [],
-        "Other Changes": []
+# Each page returns the release node and a page of merged PRs already shaped as we
+# need them; the first page also lists recent releases to find the previous one.
+_RELEASE_PRS_QUERY = """
+query($owner: String!, $name: String!, $tag: String!, $first: Int!, $after: String, $releasesFirst: Int!, $withReleases: Boolean!) {
+  repository(owner: $owner, name: $name) {
+    release(tagName: $tag) {
+      publishedAt
+      tagCommit { oid }
     }
+    releases(first: $releasesFirst, orderBy: {field: CREATED_AT, direction: DESC}) @include(if: $withReleases) {
+      nodes { publishedAt }
+    }
+    pullRequests(states: MERGED, first: $first, after: $after, orderBy: {field: UPDATED_AT, direction: DESC}) {
+      pageInfo { hasNextPage endCursor }
+      nodes {
+        number
+        title
+        url
+        mergedAt
+        updatedAt
+        labels(first: 10) { nodes { name } }
+      }
+    }
+  }
+}
+"""
 
-    BUG_KEYWORDS = ["bug", "fix", "defect", "hotfix"]
-    ENHANCEMENT_KEYWORDS = ["feature", "enhancement", "new", "feat"]
+def _graphql(query: str, variables: Dict[str, Any]) -> httpx.Response:
+    """Internal helper for GitHub GraphQL calls (requires GITHUB_TOKEN)."""
+    # The shared client already carries the bearer token
+    return _send("POST", GRAPHQL_URL, json={"query": query, "variables": variables})
+
+def _graphql_error_message(errors: List[Dict[str, Any]]) -> Optional[str]:
+    """
+    Joins the messages of GraphQL errors other than NOT_FOUND (e.g. RATE_LIMITED),
+    or returns None when every error only says a node does not exist.
+    """
+    messages = [error.get('message', 'Unknown error') for error in errors if error.get('type') != 'NOT_FOUND']
+    return '; '.join(messages) or None
+
+def _get_release_prs_graphql(org_name: str, repo_name: str, tag_name: str) -> str:
+    """GraphQL body of `get_release_prs`; pages of PRs are followed by cursor."""
+    key = (org_name, repo_name, tag_name)
+    variables = {
+        "owner": org_name,
+        "name": repo_name,
+        "tag": tag_name,
+        "first": _PR_PAGE_SIZE,
+        "after": None,
+        "releasesFirst": _RELEASES_PAGE_SIZE,
+        "withReleases": key not in _previous_release_cache,
+    }
+
+    all_prs = []
+    notes = []
+    published_at, previous_at = "", None
+    for page in range(_MAX_PR_PAGES):
+        try:
+            response = _graphql(_RELEASE_PRS_QUERY, variables)
+
+            if response.status_code != 200:
+                return f"ERROR: GitHub GraphQL API failed with status code {response.status_code}."
+
+            payload = _json(response)
+        except (httpx.HTTPError, orjson.JSONDecodeError) as e:
+            return f"TOOL_ERROR: Network or connection issue: {str(e)}"
+
+        repository = (payload.get('data') or {}).get('repository')
+        if not repository:
+            # A 200 can still carry errors such as RATE_LIMITED instead of data
+            error_message = _graphql_error_message(payload.get('errors') or [])
+            if error_message:
+                return f"ERROR: GitHub GraphQL API returned errors: {error_message}"
+            return f"ERROR: Repository {org_name}/{repo_name} not found."
+
+        if page == 0:
+            release = repository.get('release')
+            if not release:
+                return f"ERROR: Could not find release tag `{tag_name}` for categorization."
+
+            published_at = release.get('publishedAt') or datetime.now().isoformat()
+            if variables["withReleases"]:
+                release_dates = [node['publishedAt'] for node in repository['releases']['nodes']]
+                previous_at = _remember_previous_release(key, release_dates, published_at)
+            else:
+                previous_at = _previous_release_cache.get(key)
+            variables["withReleases"] = False
+
+        # Same window as the REST path: merged after the previous release, up to this one
+        reached_cutoff = False
+        for node in repository['pullRequests']['nodes']:
+            if previous_at and node['updatedAt'] < previous_at:
+                reached_cutoff = True
+                break
+            if _in_release_window(node['mergedAt'], published_at, previous_at):
+                all_prs.append({
+                    "number": node['number'],
+                    "title": node['title'],
+                    "labels": [label['name'] for label in node['labels']['nodes']],
+                    "url": node['url'],
+                })
+
+        page_info = repository['pullRequests']['pageInfo']
+        if reached_cutoff or not page_info['hasNextPage']:
+            break
+        variables["after"] = page_info['endCursor']
+    else:
+        notes.append(_SCAN_CAPPED_NOTE) # Reached neither the cutoff nor the last page
+
+    return _summarize_release_prs(org_name, repo_name, tag_name, all_prs, notes)
+
+def _summarize_release_prs(
+    org_name: str,
+    repo_name: str,
+    tag_name: str,
+    all_prs: List[Dict[str, Any]],
+    notes: Sequence[str] = (),
+    partial: bool = False,
+) -> str:
+    """
+    Categorizes the release PRs and formats the report for the LLM. `notes` explain
+    gaps in the scan; a `partial` report is labelled PARTIAL rather than SUCCESS.
+    """
+    status = "PARTIAL" if partial else "SUCCESS"
+
+    if not all_prs:
+        return '\n'.join(itertools.chain((f"{status}: Found no merged Pull Requests for release `{tag_name}`.",), notes))
+
+    # 3. Categorize Changes (single pass, each PR lands in exactly one bucket)
+    bug_fixes, enhancements, other_changes = [], [], []
 
     for pr in all_prs:
         title_lower = pr['title'].lower()
-        labels_lower = [label.lower() for label in pr['labels']]
+        labels_set = {label.lower() for label in pr['labels']}
         
-        if any(kw in labels_lower for kw in BUG_KEYWORDS) or title_lower.startswith('fix'):
-            summary["Bug Fixes"].append(f"#{pr['number']}: {pr['title']}")
-        elif any(kw in labels_lower for kw in ENHANCEMENT_KEYWORDS) or title_lower.startswith('feat'):
-            summary["Enhancements/Features"].append(f"#{pr['number']}: {pr['title']}")
+        if not _BUG_KW.isdisjoint(labels_set) or title_lower.startswith(_FIX_PREFIXES):
+            bucket = bug_fixes
+        elif not _ENH_KW.isdisjoint(labels_set) or title_lower.startswith(_FEAT_PREFIXES):
+            bucket = enhancements
         else:
-            summary["Other Changes"].append(f"#{pr['number']}: {pr['title']}")
+            bucket = other_changes
+        bucket.append(f"#{pr['number']}: {pr['title']}")
 
     # 4. Format Output for LLM
-    output_parts = [
-        f"SUCCESS: Analysis for {org_name}/{repo_name} release `{tag_name}`:",
-        f"Total Relevant PRs Found: {len(all_prs)}"
-    ]
-    
-    for category, items in summary.items():
-        if items:
-            output_parts.append(f"\n--- {category} ({len(items)}) ---")
-            output_parts.extend(items)
-            
-    return '\n'.join(output_parts)
+    header = (
+        f"{status}: Analysis for {org_name}/{repo_name} release `{tag_name}`:",
+        f"Total Relevant PRs Found: {len(all_prs)}",
+        *notes,
+    )
+    sections = (
+        itertools.chain((f"\n--- {category} ({len(items)}) ---",), items)
+        for category, items in (
+            ("Bug Fixes", bug_fixes),
+            ("Enhancements/Features", enhancements),
+            ("Other Changes", other_changes),
+        )
+        if items
+    )
+    return '\n'.join(itertools.chain(header, itertools.chain.from_iterable(sections)))
 
+def get_release_prs(org_name: str, repo_name: str, tag_name: str) -> str:
+    """
+    Analyzes merged Pull Requests that were included in a specific release tag
+    and categorizes them into Bug Fixes, Enhancements, and Other Changes based
+    on labels and Conventional Commit prefixes (fix:, feat:).
+    """
+    # GraphQL does not allow anonymous access, so without a token we use REST.
+    if _GITHUB_TOKEN:
+        return _get_release_prs_graphql(org_name, repo_name, tag_name)
+    return asyncio.run(_get_release_prs_async(org_name, repo_name, tag_name))
 
-# --- Tool 4: Check GitHub API Health (NEW) ---
-import requests
-from datetime import datetime # <--- MAKE SURE datetime IS IMPORTED AT THE TOP
-from typing import Dict, Any, List, Optional
-# ... (Keep existing code from Tool 1, 2, and 3)
 
 # ----------------------------------------------------------------------
 # --- Tool 4: Check GitHub API Health (NEW) ---
 # ----------------------------------------------------------------------
 
+_RESET_TIME_FMT = "%Y-%m-%d %H:%M:%S"
+
 def check_github_api_health() -> Dict[str, Any]:
     """
     Checks the remaining rate limit for the GitHub token currently in use.
     Returns the limit, remaining calls, and the reset time.
     """
     api_url = "https://api.github.com/rate_limit"
-    headers = _get_auth_headers() # Uses the existing helper to get the token
+    headers = _AUTH_HEADERS # Built once at import with the token
 
     try:
-        response = requests.get(api_url, headers=headers)
+        response = _make_api_call(api_url, headers)
         
         if response.status_code != 200:
             return {
@@ -227,7 +599,7 @@ def check_github_api_health() -> Dict[str, Any]:
                 "remaining": 0
             }
 
-        data = response.json()
+        data = _json(response)
         rate_data = data.get('resources', {}).get('core', {})
         
         limit = rate_data.get('limit', 'N/A')
@@ -237,19 +609,139 @@ def check_github_api_health() -> Dict[str, Any]:
         reset_time = 'N/A'
         if isinstance(reset_ts, int):
             # Convert Unix timestamp to human-readable time
-            reset_time = datetime.fromtimestamp(reset_ts).strftime("%Y-%m-%d %H:%M:%S")
+            reset_time = datetime.fromtimestamp(reset_ts).strftime(_RESET_TIME_FMT)
 
         return {
             "status": "SUCCESS",
             "limit": limit,
             "remaining": remaining,
             "reset_time": reset_time,
-            "used_token": bool(os.getenv("GITHUB_TOKEN"))
+            "used_token": bool(_GITHUB_TOKEN)
         }
 
-    except requests.exceptions.RequestException as e:
+    except (httpx.HTTPError, orjson.JSONDecodeError) as e:
         return {
             "status": "TOOL_ERROR",
             "message": f"Network error during health check: {str(e)}",
             "remaining": 0
         }
+
+# ----------------------------------------------------------------------
+# --- Tool 5: Check Latest Releases in Bulk (NEW) ---
+# ----------------------------------------------------------------------
+
+_BULK_RELEASE_FIELDS = "latestRelease { tagName publishedAt url description }"
+
+def _build_bulk_release_query(count: int) -> str:
+    """Builds one GraphQL query with an aliased `repository` lookup (r0, r1, ...) per repo."""
+    arguments = ", ".join(f"$o{i}: String!, $n{i}: String!" for i in range(count))
+    lookups = "\n".join(
+        f"  r{i}: repository(owner: $o{i}, name: $n{i}) {{ {_BULK_RELEASE_FIELDS} }}"
+        for i in range(count)
+    )
+    return f"query({arguments}) {{\n{lookups}\n}}"
+
+def check_latest_releases_bulk(repos: List[Dict[str, str]]) -> Dict[str, Any]:
+    """
+    Checks the latest stable release of several public repositories at once
+    (e.g., hashicorp/vault and hashicorp/consul) in a single GitHub request.
+    Each entry in `repos` has an `org_name` and a `repo_name`.
+    """
+    if not repos:
+        return {"status": "ERROR", "message": "No repositories were given."}
+
+    # GraphQL does not allow anonymous access, so without a token we use REST.
+    if not _GITHUB_TOKEN:
+        return {
+            "status": "SUCCESS",
+            "releases": [check_latest_release(repo['org_name'], repo['repo_name']) for repo in repos],
+        }
+
+    variables = {}
+    for i, repo in enumerate(repos):
+        variables[f"o{i}"] = repo['org_name']
+        variables[f"n{i}"] = repo['repo_name']
+
+    try:
+        response = _graphql(_build_bulk_release_query(len(repos)), variables)
+
+        if response.status_code != 200:
+            return {"status": "ERROR", "message": f"GitHub GraphQL API failed with status code {response.status_code}."}
+
+        payload = _json(response)
+    except (httpx.HTTPError, orjson.JSONDecodeError) as e:
+        return {"status": "TOOL_ERROR", "message": f"Network or connection issue: {str(e)}"}
+
+    data = payload.get('data') or {}
+    errors = payload.get('errors') or []
+
+    # Top-level failures (e.g. RATE_LIMITED) come back with no data at all
+    if not data:
+        messages = '; '.join(error.get('message', 'Unknown error') for error in errors)
+        return {"status": "ERROR", "message": f"GitHub GraphQL API returned errors: {messages or 'no data'}"}
+
+    # Per-repository errors (e.g. NOT_FOUND) carry the alias as the first `path` entry
+    errors_by_alias: Dict[str, List[str]] = {}
+    for error in errors:
+        path = error.get('path') or []
+        if path:
+            errors_by_alias.setdefault(path[0], []).append(error.get('message', 'Unknown error'))
+
+    releases = []
+    for i, repo in enumerate(repos):
+        full_name = f"{repo['org_name']}/{repo['repo_name']}"
+        repository = data.get(f"r{i}")
+        release = (repository or {}).get('latestRelease')
+
+        if f"r{i}" in errors_by_alias:
+            releases.append({"status": "ERROR", "repository": full_name, "message": '; '.join(errors_by_alias[f"r{i}"])})
+            continue
+        if repository is None:
+            releases.append({"status": "ERROR", "repository": full_name, "message": f"GitHub returned no data for {full_name}."})
+            continue
+        if not release:
+            releases.append({"status": "ERROR", "repository": full_name, "message": f"Repository {full_name} has no releases."})
+            continue
+
+        releases.append(_release_summary(
+            full_name,
+            release.get('tagName', 'N/A'),
+            release.get('publishedAt'),
+            release.get('url', 'N/A'),
+            release.get('description'),
+        ))
+
+    return {"status": "SUCCESS", "releases": releases}
+
+# ----------------------------------------------------------------------
+# --- Speculative prefetch of the API health check ---
+# ----------------------------------------------------------------------
+
+# Started explicitly by the caller (importing this module has no side effects), so
+# the request can overlap with the caller's own slow startup work.
+_HEALTH_FUTURE: Optional[Future] = None
+_health_prefetch_started = False
+
+def start_health_prefetch() -> None:
+    """
+    Starts `check_github_api_health()` in a background thread, once per process;
+    `get_prefetched_api_health()` picks the result up.
+    """
+    global _HEALTH_FUTURE, _health_prefetch_started
+    if _health_prefetch_started:
+        return
+    _health_prefetch_started = True
+    executor = ThreadPoolExecutor(max_workers=1)
+    _HEALTH_FUTURE = executor.submit(check_github_api_health)
+    executor.shutdown(wait=False)  # the worker exits once the prefetch is done
+
+def get_prefetched_api_health() -> Dict[str, Any]:
+    """
+    Returns the prefetched health check on the first call after
+    `start_health_prefetch()`, and a fresh `check_github_api_health()` result otherwise.
+    """
+    global _HEALTH_FUTURE
+    future, _HEALTH_FUTURE = _HEALTH_FUTURE, None
+    if future is not None:
+        return future.result()
+    return check_github_api_health()